@@ -1,7 +1,10 @@
 import os
+from contextlib import contextmanager
+from functools import cached_property
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task, before_kickoff, after_kickoff
 from falc_crew.tools.custom_tool import FalcDocxWriterTool, FalcIconLookupTool, WordExtractorTool, ReferenceModelRetrieverTool
+from falc_crew.memory_policy import MemoryPolicy, memory_metrics
 from crewai.knowledge.source.text_file_knowledge_source import TextFileKnowledgeSource
 from crewai.knowledge.source.json_knowledge_source import JSONKnowledgeSource
 
@@ -23,6 +26,14 @@ class FalcCrew():
     reference_tool = ReferenceModelRetrieverTool()
     reference_tool.add(data_type="directory", source="data/reference_models")
 
+    memory_scope = None
+    memory_crew = None
+
+    @cached_property
+    def memory_policy(self) -> MemoryPolicy:
+        # Memory mode (off / job / shared) is read from FALC_MEMORY_* env variables
+        return MemoryPolicy.from_env()
+
     # If you would like to add tools to your agents, you can learn more about it here:
     # https://docs.crewai.com/concepts/agents#agent-tools
 
@@ -31,7 +42,7 @@ class FalcCrew():
         return Agent(
             config=self.agents_config['falc_translator'],
             tools=[FalcIconLookupTool(), WordExtractorTool(), self.reference_tool],
-            memory=True,
+            memory=self.memory_policy.enabled,
             verbose=True,
         )
 
@@ -41,7 +52,7 @@ class FalcCrew():
         return Agent(
             config=self.agents_config['falc_document_designer'],
             tools=[FalcDocxWriterTool()],
-            memory=True,
+            memory=self.memory_policy.enabled,
             verbose=True,
         )
 
@@ -63,21 +74,58 @@ class FalcCrew():
         )
 
 
+    def open_memory(self):
+        """Opens a new memory scope, closing the previous one first"""
+        self.close_memory()
+        self.memory_scope = self.memory_policy.open_scope()
+        return self.memory_scope
+
+
+    def close_memory(self):
+        """Releases the job-scoped memory and reports the memory metrics"""
+        if self.memory_scope is None:
+            return
+        # @crew memoizes the Crew for the process lifetime: don't let it keep the scope alive
+        if self.memory_crew is not None:
+            self.memory_scope.detach(self.memory_crew)
+            self.memory_crew = None
+        self.memory_scope.close()
+        self.memory_scope = None
+        print(f"🧠 Memory ({self.memory_policy.mode}) metrics: {memory_metrics()}")
+
+
+    @contextmanager
+    def memory_session(self):
+        """Keeps one memory scope open for a whole entry point (run, replay...)"""
+        self.open_memory()
+        try:
+            yield self
+        finally:
+            self.close_memory()
+
+
     @crew
     def crew(self) -> Crew:
-        """Creates the FalcCrew crew"""
+        """Creates the FalcCrew crew. With memory enabled, it must be called inside memory_session()"""
         # To learn how to add knowledge sources to your crew, check out the documentation:
         # https://docs.crewai.com/concepts/knowledge#what-is-knowledge
+        if self.memory_policy.enabled and self.memory_scope is None:
+            raise RuntimeError(
+                f"❌ FalcCrew.crew() called outside memory_session() with memory mode '{self.memory_policy.mode}'"
+            )
 
-        return Crew(
+        falc_crew = Crew(
             agents=self.agents, # Automatically created by the @agent decorator
             tasks=self.tasks, # Automatically created by the @task decorator
             process=Process.sequential,
             verbose=True,
-            memory=True,
+            memory=False, # Scoped memories are attached below
             knowledge_sources=[
             TextFileKnowledgeSource(file_paths=["falc_guidelines.md"]),
             JSONKnowledgeSource(file_paths=["icons.json"])
             ]
             # process=Process.hierarchical, # In case you wanna use that instead https://docs.crewai.com/how-to/Hierarchical/
         )
+        if self.memory_scope:
+            self.memory_crew = self.memory_scope.attach(falc_crew)
+        return falc_crew
@@ -9,6 +9,7 @@ import chainlit as cl
 from datetime import datetime
 from docx import Document
 from falc_crew.crew import FalcCrew
+from falc_crew.memory_policy import MemoryPolicy, MEMORY_MODE_OFF
 from falc_crew.tools.custom_tool import WordExtractorTool, FalcIconLookupTool, FalcDocxStructureTaggerTool
 from dotenv import load_dotenv
 
@@ -69,16 +70,19 @@ async def run(file_path: str, output_dir: str):
         "output_dir": output_dir,
     }
 
+    falc_crew = FalcCrew()
+
     @cl.step(name="📄 Traduction FALC en cours...")
     async def kickoff_crew(inputs):
         async with cl.Step(name="📄 Lancement", type="system") as step:
             step.input = "Texte prêt pour la traduction"
             step.output = "Analyse en cours..."
 
-        return await FalcCrew().crew().kickoff_async(inputs=inputs)
+        return await falc_crew.crew().kickoff_async(inputs=inputs)
 
     try:
-        await kickoff_crew(inputs)
+        with falc_crew.memory_session():
+            await kickoff_crew(inputs)
     except Exception as e:
         raise Exception(f"An error occurred while running the crew: {e}")
 
@@ -143,7 +147,10 @@ def train():
     # Train
     try:
         print(f"\n🏋️ Training on: {inputs['source_filename']} for {iterations} iterations")
-        FalcCrew().crew().train(
+        falc_crew = FalcCrew()
+        # Crew.train() runs on Crew.copy(), which would rebuild crewai's default persistent memories
+        falc_crew.memory_policy = MemoryPolicy(mode=MEMORY_MODE_OFF)
+        falc_crew.crew().train(
             n_iterations=int(sys.argv[1]),
             filename=sys.argv[2],
             inputs=inputs
@@ -171,7 +178,9 @@ def replay():
     Replay the crew execution from a specific task.
     """
     try:
-        FalcCrew().crew().replay(task_id=sys.argv[1])
+        falc_crew = FalcCrew()
+        with falc_crew.memory_session():
+            falc_crew.crew().replay(task_id=sys.argv[1])
 
     except Exception as e:
         raise Exception(f"An error occurred while replaying the crew: {e}")
@@ -185,7 +194,10 @@ def test():
         "current_year": str(datetime.now().year)
     }
     try:
-        FalcCrew().crew().test(n_iterations=int(sys.argv[1]), openai_model_name=sys.argv[2], inputs=inputs)
+        falc_crew = FalcCrew()
+        # Crew.test() runs on Crew.copy(), which would rebuild crewai's default persistent memories
+        falc_crew.memory_policy = MemoryPolicy(mode=MEMORY_MODE_OFF)
+        falc_crew.crew().test(n_iterations=int(sys.argv[1]), openai_model_name=sys.argv[2], inputs=inputs)
 
     except Exception as e:
         raise Exception(f"An error occurred while testing the crew: {e}")
@@ -194,12 +206,9 @@ def test():
 if __name__ == "__main__":
     run()
 
-    # Inspect entity memory
-    from falc_crew.crew import FalcCrew
-    crew_instance = FalcCrew()
-    agent = crew_instance.falc_translator()
+    # Inspect memory usage
+    from falc_crew.memory_policy import memory_metrics
 
-    if agent.entity_memory:
-        print("🧠 ENTITÉS MÉMORISÉES")
-        for key, value in agent.entity_memory.store.items():
-            print(f"{key}: {value}")
+    print("🧠 MÉMOIRE")
+    for memory_type, metrics in memory_metrics().items():
+        print(f"{memory_type}: {metrics}")
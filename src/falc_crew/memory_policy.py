@@ -0,0 +1,400 @@
+"""
+Memory policy for the FalcCrew agents.
+
+The policy is selected with the ``FALC_MEMORY_MODE`` environment variable:
+
+- ``off``: agents and crew run without memory.
+- ``job`` (default): short-term, entity and long-term memory are private to the
+  job and wiped when it ends, so one letter never ends up in the context of the
+  next job.
+- ``shared``: the memories are shared by every job of the process and wiped
+  when it exits.
+
+In both modes each store is capped at ``FALC_MEMORY_MAX_ENTRIES`` entries (LRU
+eviction, oldest rows for long-term memory) and entries optionally expire after
+``FALC_MEMORY_TTL_SECONDS``.
+
+Short-term and entity memories of every scope share one chromadb client and
+collection per memory type, entries being tagged with their scope: a client or
+a collection per job would keep its sqlite and HNSW files open for the life of
+the process.
+
+Store sizes and retrieval latencies are aggregated per memory type and can be
+read with ``memory_metrics()``.
+"""
+import atexit
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import closing
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from crewai.memory import EntityMemory, LongTermMemory, ShortTermMemory
+from crewai.memory.storage.interface import Storage
+from crewai.memory.storage.ltm_sqlite_storage import LTMSQLiteStorage
+from crewai.memory.storage.rag_storage import RAGStorage, suppress_logging
+
+
+MEMORY_MODE_OFF = "off"
+MEMORY_MODE_JOB = "job"
+MEMORY_MODE_SHARED = "shared"
+MEMORY_MODES = (MEMORY_MODE_OFF, MEMORY_MODE_JOB, MEMORY_MODE_SHARED)
+
+DEFAULT_MAX_ENTRIES = 500
+
+
+# ========== Metrics ==========
+@dataclass
+class MemoryMetrics:
+    """Counters for one memory type, aggregated over every store of that type."""
+    entries: int = 0
+    saves: int = 0
+    searches: int = 0
+    lru_evictions: int = 0
+    ttl_evictions: int = 0
+    total_search_seconds: float = 0.0
+    max_search_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record_save(self):
+        with self._lock:
+            self.saves += 1
+            self.entries += 1
+
+    def record_eviction(self, lru: int = 0, ttl: int = 0):
+        with self._lock:
+            self.lru_evictions += lru
+            self.ttl_evictions += ttl
+            self.entries -= lru + ttl
+
+    def record_release(self, count: int):
+        with self._lock:
+            self.entries -= count
+
+    def record_search(self, seconds: float):
+        with self._lock:
+            self.searches += 1
+            self.total_search_seconds += seconds
+            self.max_search_seconds = max(self.max_search_seconds, seconds)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            avg = self.total_search_seconds / self.searches if self.searches else 0.0
+            return {
+                "entries": self.entries,
+                "saves": self.saves,
+                "searches": self.searches,
+                "lru_evictions": self.lru_evictions,
+                "ttl_evictions": self.ttl_evictions,
+                "avg_search_ms": round(avg * 1000, 2),
+                "max_search_ms": round(self.max_search_seconds * 1000, 2),
+            }
+
+
+_METRICS: Dict[str, MemoryMetrics] = {}
+_METRICS_LOCK = threading.Lock()
+
+
+def _metrics_for(memory_type: str) -> MemoryMetrics:
+    with _METRICS_LOCK:
+        return _METRICS.setdefault(memory_type, MemoryMetrics())
+
+
+def memory_metrics() -> Dict[str, dict]:
+    """Return a snapshot of the memory metrics, keyed by memory type."""
+    with _METRICS_LOCK:
+        metrics = dict(_METRICS)
+    return {memory_type: m.as_dict() for memory_type, m in metrics.items()}
+
+
+# ========== BoundedRAGStorage ==========
+class BoundedRAGStorage(Storage):
+    """
+    RAGStorage wrapper that tracks its own entries so they can be evicted.
+    Entries are kept in recency order: a search hit moves the entry to the end,
+    the oldest entries are dropped once ``max_entries`` is exceeded and entries
+    older than ``ttl_seconds`` are dropped before every save and search.
+    """
+
+    def __init__(
+        self,
+        type: str,
+        path: str,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        embedder_config: Optional[dict] = None,
+        scope: Optional[str] = None,
+    ):
+        self.type = type
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.metrics = _metrics_for(type)
+        # Entries are tagged with their scope so several scopes can share the collection
+        self._where = {"falc_scope": scope} if scope else None
+        self._rag = RAGStorage(type=type, allow_reset=True, embedder_config=embedder_config, path=path)
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self) -> int:
+        return len(self._entries)
+
+    def save(self, value: Any, metadata: Dict[str, Any]) -> None:
+        # Embedding may be a network call: only the bookkeeping is done under the lock
+        entry_id = str(uuid.uuid4())
+        metadata = {**(metadata or {}), **(self._where or {})}
+        self._rag.collection.add(documents=[value], metadatas=[metadata], ids=[entry_id])
+        with self._lock:
+            self._entries[entry_id] = time.monotonic()
+            self.metrics.record_save()
+            self._evict()
+
+    def search(self, query: str, limit: int = 3, score_threshold: float = 0.35) -> List[Any]:
+        with self._lock:
+            self._evict()
+            if not self._entries:
+                return []
+
+        start = time.perf_counter()
+        results = self._query(query, limit, score_threshold)
+        self.metrics.record_search(time.perf_counter() - start)
+
+        with self._lock:
+            for result in results:
+                if result.get("id") in self._entries:
+                    self._entries.move_to_end(result["id"])
+        return results
+
+    def reset(self) -> None:
+        with self._lock:
+            if self._entries:
+                self._rag.collection.delete(ids=list(self._entries))
+                self.metrics.record_release(len(self._entries))
+            self._entries.clear()
+
+    def _query(self, query: str, limit: int, score_threshold: float) -> List[Any]:
+        """RAGStorage.search, restricted to the entries of this scope."""
+        try:
+            with suppress_logging():
+                response = self._rag.collection.query(query_texts=query, n_results=limit, where=self._where)
+        except Exception as e:
+            logging.error(f"Error during {self.type} search: {str(e)}")
+            return []
+
+        results = []
+        for i in range(len(response["ids"][0])):
+            result = {
+                "id": response["ids"][0][i],
+                "metadata": response["metadatas"][0][i],
+                "context": response["documents"][0][i],
+                "score": response["distances"][0][i],
+            }
+            if result["score"] >= score_threshold:
+                results.append(result)
+        return results
+
+    def _evict(self):
+        expired = []
+        if self.ttl_seconds:
+            cutoff = time.monotonic() - self.ttl_seconds
+            expired = [entry_id for entry_id, created in self._entries.items() if created < cutoff]
+            for entry_id in expired:
+                del self._entries[entry_id]
+
+        overflow = []
+        if self.max_entries:
+            while len(self._entries) > self.max_entries:
+                overflow.append(self._entries.popitem(last=False)[0])
+
+        if expired or overflow:
+            self._rag.collection.delete(ids=expired + overflow)
+            self.metrics.record_eviction(lru=len(overflow), ttl=len(expired))
+
+
+# ========== BoundedLTMStorage ==========
+class BoundedLTMStorage(LTMSQLiteStorage):
+    """
+    LTMSQLiteStorage capped at ``max_entries`` rows (oldest rows dropped first).
+    Rows older than ``ttl_seconds`` are dropped before every save and load.
+    """
+
+    def __init__(self, db_path: str, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        super().__init__(db_path=db_path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.metrics = _metrics_for("long_term")
+        self._lock = threading.Lock()
+
+    def count(self) -> int:
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            return conn.execute("SELECT COUNT(*) FROM long_term_memories").fetchone()[0]
+
+    def save(self, task_description: str, metadata: Dict[str, Any], datetime: str, score) -> None:
+        with self._lock:
+            before = self.count()
+            super().save(task_description, metadata, datetime, score)
+            if self.count() > before:
+                self.metrics.record_save()
+            self._evict()
+
+    def load(self, task_description: str, latest_n: int) -> Optional[List[Dict[str, Any]]]:
+        start = time.perf_counter()
+        with self._lock:
+            self._evict()
+            rows = super().load(task_description, latest_n)
+        self.metrics.record_search(time.perf_counter() - start)
+        return rows
+
+    def reset(self) -> None:
+        with self._lock:
+            count = self.count()
+            super().reset()
+            self.metrics.record_release(count - self.count())
+
+    def _evict(self):
+        # crewai stores the ``datetime`` column as str(time.time())
+        expired = overflow = 0
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            if self.ttl_seconds:
+                expired = conn.execute(
+                    "DELETE FROM long_term_memories WHERE CAST(datetime AS REAL) < ?",
+                    (time.time() - self.ttl_seconds,),
+                ).rowcount
+            if self.max_entries:
+                overflow = conn.execute(
+                    "DELETE FROM long_term_memories WHERE id NOT IN "
+                    "(SELECT id FROM long_term_memories ORDER BY id DESC LIMIT ?)",
+                    (self.max_entries,),
+                ).rowcount
+        if expired or overflow:
+            self.metrics.record_eviction(lru=overflow, ttl=expired)
+
+
+# ========== MemoryScope ==========
+class MemoryScope:
+    """
+    Short-term, entity and long-term stores of one job (or of the whole process).
+    A job scope is wiped by ``close()``; the shared scope is only wiped when the
+    process exits. ``path`` holds the long-term memory database.
+    """
+
+    def __init__(self, path: str, max_entries=None, ttl_seconds=None, scoped: bool = True, embedder_config=None):
+        self.path = path
+        self.scoped = scoped
+        scope = uuid.uuid4().hex if scoped else "shared"
+        chroma_path = _chroma_path()
+        self.short_term = BoundedRAGStorage("short_term", chroma_path, max_entries, ttl_seconds, embedder_config, scope)
+        self.entities = BoundedRAGStorage("entities", chroma_path, max_entries, ttl_seconds, embedder_config, scope)
+        self.long_term = BoundedLTMStorage(
+            os.path.join(path, "long_term_memory_storage.db"), max_entries, ttl_seconds
+        )
+        self._released = False
+        atexit.register(self._release)
+
+    def attach(self, crew):
+        """
+        Hand the scope's memories to a crew built with ``memory=False``.
+
+        They are set on the crew's private attributes rather than passed as
+        ``short_term_memory``/``entity_memory``/``long_term_memory``: Crew.copy()
+        rebuilds those public fields from model_dump() and rejects them.
+        """
+        crew.memory = True
+        crew._short_term_memory = ShortTermMemory(storage=self.short_term)
+        crew._entity_memory = EntityMemory(storage=self.entities)
+        crew._long_term_memory = LongTermMemory(storage=self.long_term)
+        crew._user_memory = None
+        return crew
+
+    def detach(self, crew):
+        """Take the scope's memories back from a crew, so the crew no longer keeps them alive."""
+        crew.memory = False
+        crew._short_term_memory = None
+        crew._entity_memory = None
+        crew._long_term_memory = None
+        return crew
+
+    def close(self):
+        """Wipe a job-scoped memory. The shared memory outlives the job and is kept."""
+        if self.scoped:
+            self._release()
+
+    def _release(self):
+        if self._released:
+            return
+        self._released = True
+        atexit.unregister(self._release)
+        self.short_term.reset()
+        self.entities.reset()
+        self.long_term.reset()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+_CHROMA_PATH: Optional[str] = None
+_CHROMA_LOCK = threading.Lock()
+
+
+def _chroma_path() -> str:
+    """Directory of the process-wide chromadb client, removed when the process exits."""
+    global _CHROMA_PATH
+    with _CHROMA_LOCK:
+        if _CHROMA_PATH is None:
+            _CHROMA_PATH = tempfile.mkdtemp(prefix="falc_memory_chroma_")
+            atexit.register(shutil.rmtree, _CHROMA_PATH, True)
+        return _CHROMA_PATH
+
+
+_SHARED_SCOPE: Optional[MemoryScope] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def _shared_scope(max_entries, ttl_seconds, embedder_config) -> MemoryScope:
+    global _SHARED_SCOPE
+    with _SHARED_LOCK:
+        if _SHARED_SCOPE is None:
+            path = tempfile.mkdtemp(prefix="falc_memory_shared_")
+            _SHARED_SCOPE = MemoryScope(path, max_entries, ttl_seconds, scoped=False, embedder_config=embedder_config)
+        return _SHARED_SCOPE
+
+
+# ========== MemoryPolicy ==========
+@dataclass
+class MemoryPolicy:
+    mode: str = MEMORY_MODE_JOB
+    max_entries: Optional[int] = DEFAULT_MAX_ENTRIES
+    ttl_seconds: Optional[float] = None
+    embedder_config: Optional[dict] = None
+
+    def __post_init__(self):
+        if self.mode not in MEMORY_MODES:
+            raise ValueError(f"❌ Unknown memory mode '{self.mode}', expected one of {MEMORY_MODES}")
+
+    @classmethod
+    def from_env(cls) -> "MemoryPolicy":
+        mode = os.getenv("FALC_MEMORY_MODE", MEMORY_MODE_JOB).strip().lower()
+        max_entries = int(os.getenv("FALC_MEMORY_MAX_ENTRIES") or DEFAULT_MAX_ENTRIES)
+        ttl = os.getenv("FALC_MEMORY_TTL_SECONDS")
+        return cls(
+            mode=mode,
+            max_entries=max_entries if max_entries > 0 else None,
+            ttl_seconds=float(ttl) if ttl else None,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != MEMORY_MODE_OFF
+
+    def open_scope(self) -> Optional[MemoryScope]:
+        """Return the memory stores for a new crew, or None when memory is off."""
+        if self.mode == MEMORY_MODE_OFF:
+            return None
+        if self.mode == MEMORY_MODE_SHARED:
+            return _shared_scope(self.max_entries, self.ttl_seconds, self.embedder_config)
+        path = tempfile.mkdtemp(prefix="falc_memory_job_")
+        return MemoryScope(path, self.max_entries, self.ttl_seconds, scoped=True, embedder_config=self.embedder_config)
@@ -8,6 +8,10 @@ from pydantic import BaseModel, Field
 from datetime import datetime
 from docx import Document
 from docx.shared import Pt, Inches
+from falc_crew.tools.docx_patch import DocxXmlPatcher
+
+
+ICON_WIDTH_INCHES = 0.2
 
 
 # ========== WordExtractorTool ==========
@@ -92,9 +96,9 @@ class FalcDocxWriterTool(BaseTool):
         with open(icons_path, "r", encoding="utf-8") as f:
             return json.load(f)
 
-    def _insert_text_and_icons(self, paragraph, text, icons_map):
+    def _split_text_and_icons(self, text, icons_map):
         """
-        Split the text by icon placeholders and add text runs and image runs.
+        Split the text by icon placeholders and yield ("text", value) and ("icon", image_path) parts.
         The placeholder format is assumed to be [[ICON:KEY]].
         """
         # Regex pattern to detect the placeholder pattern.
@@ -109,12 +113,10 @@ class FalcDocxWriterTool(BaseTool):
                     key = icon_key[0].strip()
                     image_path = icons_map.get(key)
                     if image_path and os.path.exists(image_path):
-                        run = paragraph.add_run()
-                        # Adjust the image size as needed (e.g., width=Inches(0.2))
-                        run.add_picture(image_path, width=Inches(0.2))
+                        yield "icon", image_path
                     else:
                         # If image is not found, insert the placeholder as text.
-                        paragraph.add_run(f"[Missing icon: {key}]")
+                        yield "text", f"[Missing icon: {key}]"
             else:
                 # Remove icon labels like 'direction' after [[ICON:direction]]
                 cleaned = part.strip()
@@ -122,7 +124,19 @@ class FalcDocxWriterTool(BaseTool):
                     # Skip it — already shown as an icon
                     continue
 
-                paragraph.add_run(part)
+                yield "text", part
+
+    def _insert_text_and_icons(self, paragraph, text, icons_map):
+        """
+        Add text runs and image runs to a python-docx paragraph.
+        """
+        for kind, value in self._split_text_and_icons(text, icons_map):
+            if kind == "icon":
+                run = paragraph.add_run()
+                # Adjust the image size as needed (e.g., width=Inches(0.2))
+                run.add_picture(value, width=Inches(ICON_WIDTH_INCHES))
+            else:
+                paragraph.add_run(value)
 
     def _run(
         self,
@@ -140,20 +154,12 @@ class FalcDocxWriterTool(BaseTool):
         icons_map = self.load_icons_map()
 
         if original_file and subject_index is not None and body_indexes:
-            # 🔁 Rewrite mode
-            doc = Document(original_file)
-            paragraphs = doc.paragraphs
-
-            if 0 <= subject_index < len(paragraphs):
-                para = paragraphs[subject_index]
-                para.clear()
-                self._insert_text_and_icons(para, subject, icons_map)
+            # 🔁 Rewrite mode: patch word/document.xml, stream every other part unchanged
+            patcher = DocxXmlPatcher(original_file, icon_width_inches=ICON_WIDTH_INCHES)
+            patcher.replace_paragraph(subject_index, self._split_text_and_icons(subject, icons_map))
 
             for i, section in zip(body_indexes, body_sections):
-                if 0 <= i < len(paragraphs):
-                    para = paragraphs[i]
-                    para.clear()
-                    self._insert_text_and_icons(para, section, icons_map)
+                patcher.replace_paragraph(i, self._split_text_and_icons(section, icons_map))
 
             timestamp = datetime.now().strftime("%Y%m%d_%H%M")
             original_name = os.path.splitext(os.path.basename(original_file))[0]
@@ -162,6 +168,9 @@ class FalcDocxWriterTool(BaseTool):
             os.makedirs(output_dir, exist_ok=True)
             output_path = os.path.join(output_dir, output_filename)
 
+            patcher.save(output_path)
+            return f"✅ FALC document saved: {output_path}"
+
         else:
             # 🆕 Build new layout
             doc = Document()
@@ -0,0 +1,278 @@
+"""
+Zip/XML level patching of .docx files.
+
+Only the main document part (usually ``word/document.xml``, plus its
+relationships and ``[Content_Types].xml`` when icons are added) is parsed and
+rewritten. Every other part of the package
+(media, headers, footers, styles...) is streamed into the output unchanged, so
+large, image-heavy originals keep their exact layout and are never loaded
+as a whole in memory.
+"""
+import mimetypes
+import os
+import posixpath
+import shutil
+import struct
+import zipfile
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from lxml import etree
+
+
+PACKAGE_RELS_PART = "_rels/.rels"
+CONTENT_TYPES_PART = "[Content_Types].xml"
+
+NS = {
+    "w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "wp": "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing",
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "pic": "http://schemas.openxmlformats.org/drawingml/2006/picture",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+    "ct": "http://schemas.openxmlformats.org/package/2006/content-types",
+}
+IMAGE_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+OFFICE_DOCUMENT_REL_TYPES = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument",
+    "http://purl.oclc.org/ooxml/officeDocument/relationships/officeDocument",
+)
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+EMU_PER_INCH = 914400
+
+INLINE_PICTURE_XML = (
+    '<w:r xmlns:w="{w}" xmlns:r="{r}" xmlns:wp="{wp}" xmlns:a="{a}" xmlns:pic="{pic}">'
+    '<w:drawing>'
+    '<wp:inline distT="0" distB="0" distL="0" distR="0">'
+    '<wp:extent cx="{{cx}}" cy="{{cy}}"/>'
+    '<wp:docPr id="{{doc_pr_id}}" name="Picture {{doc_pr_id}}"/>'
+    '<wp:cNvGraphicFramePr><a:graphicFrameLocks noChangeAspect="1"/></wp:cNvGraphicFramePr>'
+    '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+    '<pic:pic>'
+    '<pic:nvPicPr><pic:cNvPr id="0" name=""/><pic:cNvPicPr/></pic:nvPicPr>'
+    '<pic:blipFill><a:blip r:embed="{{rel_id}}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+    '<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{{cx}}" cy="{{cy}}"/></a:xfrm>'
+    '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></pic:spPr>'
+    '</pic:pic>'
+    '</a:graphicData></a:graphic>'
+    '</wp:inline>'
+    '</w:drawing>'
+    '</w:r>'
+).format(**NS)
+
+
+def _w(tag: str) -> str:
+    return f"{{{NS['w']}}}{tag}"
+
+
+def _rels_part_for(part_name: str) -> str:
+    """``word/document.xml`` -> ``word/_rels/document.xml.rels``"""
+    directory, filename = posixpath.split(part_name)
+    return posixpath.join(directory, "_rels", f"{filename}.rels")
+
+
+def _image_size(image_path: str) -> Optional[Tuple[int, int]]:
+    """Read the pixel size of a PNG from its IHDR chunk, without decoding it."""
+    with open(image_path, "rb") as f:
+        header = f.read(24)
+    if header[:8] == b"\x89PNG\r\n\x1a\n" and header[12:16] == b"IHDR":
+        return struct.unpack(">II", header[16:24])
+    return None
+
+
+class DocxXmlPatcher:
+    """
+    Rewrite body paragraphs of a .docx at the XML level.
+
+    Paragraph indexes follow python-docx ``Document.paragraphs``: the ``w:p``
+    elements that are direct children of ``w:body``. A replaced paragraph keeps
+    its ``w:pPr`` (style, numbering, spacing) and gets new runs, like
+    ``Paragraph.clear()`` followed by ``add_run``/``add_picture``.
+    """
+
+    def __init__(self, source_path: str, icon_width_inches: float = 0.2):
+        self.source_path = source_path
+        self.icon_width = int(icon_width_inches * EMU_PER_INCH)
+        self._replacements: Dict[int, List[Tuple[str, str]]] = {}
+
+    def replace_paragraph(self, index: int, parts: Iterable[Tuple[str, str]]):
+        """
+        Queue the replacement of paragraph ``index``. ``parts`` is a sequence of
+        ("text", value) and ("icon", image_path) tuples, rendered in order.
+        """
+        self._replacements[index] = list(parts)
+
+    def save(self, output_path: str):
+        with zipfile.ZipFile(self.source_path) as zin:
+            existing_parts = set(zin.namelist())
+            document_part = self._main_document_part(zin, existing_parts)
+            rels_part = _rels_part_for(document_part)
+
+            document = etree.fromstring(zin.read(document_part))
+            if rels_part in existing_parts:
+                rels = etree.fromstring(zin.read(rels_part))
+            else:
+                rels = etree.Element(f"{{{NS['rel']}}}Relationships", nsmap={None: NS["rel"]})
+            content_types = etree.fromstring(zin.read(CONTENT_TYPES_PART))
+
+            media = self._patch_document(document, document_part, rels, existing_parts)
+            patched = {document_part: self._serialize(document)}
+            if media:
+                self._register_content_types(content_types, media)
+                patched[rels_part] = self._serialize(rels)
+                patched[CONTENT_TYPES_PART] = self._serialize(content_types)
+
+            with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zout:
+                for info in zin.infolist():
+                    out_info = self._clone_info(info)
+                    if info.filename in patched:
+                        zout.writestr(out_info, patched[info.filename])
+                        continue
+                    with zin.open(info) as src, zout.open(out_info, "w") as dst:
+                        shutil.copyfileobj(src, dst)
+
+                if rels_part in patched and rels_part not in existing_parts:
+                    zout.writestr(rels_part, patched[rels_part])
+                for part_name, image_path in media.items():
+                    zout.write(image_path, part_name)
+
+    @staticmethod
+    def _main_document_part(zin: zipfile.ZipFile, existing_parts) -> str:
+        """Resolve the main document part from the officeDocument relationship of ``_rels/.rels``."""
+        if PACKAGE_RELS_PART in existing_parts:
+            for rel in etree.fromstring(zin.read(PACKAGE_RELS_PART)):
+                if rel.get("Type") in OFFICE_DOCUMENT_REL_TYPES and rel.get("TargetMode") != "External":
+                    target = posixpath.normpath(rel.get("Target", "").lstrip("/"))
+                    # Part names are case-insensitive
+                    for name in existing_parts:
+                        if name.lower() == target.lower():
+                            return name
+        raise ValueError(f"❌ No main document part found in {zin.filename}")
+
+    # ---------- document part ----------
+
+    def _patch_document(self, document, document_part, rels, existing_parts) -> Dict[str, str]:
+        """Rewrite the queued paragraphs and return the new media parts {part_name: image_path}."""
+        body = document.find(_w("body"))
+        paragraphs = body.findall(_w("p")) if body is not None else []
+
+        rel_ids = {rel.get("Id") for rel in rels}
+        doc_pr_ids = [int(el.get("id")) for el in document.iter(f"{{{NS['wp']}}}docPr") if el.get("id", "").isdigit()]
+        next_doc_pr_id = max(doc_pr_ids, default=0) + 1
+
+        media: Dict[str, str] = {}
+        image_rels: Dict[str, str] = {}
+
+        for index, parts in sorted(self._replacements.items()):
+            if not 0 <= index < len(paragraphs):
+                continue
+            paragraph = paragraphs[index]
+            for child in list(paragraph):
+                if child.tag != _w("pPr"):
+                    paragraph.remove(child)
+
+            for kind, value in parts:
+                if kind == "icon":
+                    rel_id = image_rels.get(value)
+                    if rel_id is None:
+                        part_name = self._new_media_part(value, document_part, existing_parts)
+                        existing_parts.add(part_name)
+                        media[part_name] = value
+                        target = posixpath.relpath(part_name, posixpath.dirname(document_part) or ".")
+                        rel_id = self._add_image_rel(rels, rel_ids, target)
+                        image_rels[value] = rel_id
+                    paragraph.append(self._picture_run(value, rel_id, next_doc_pr_id))
+                    next_doc_pr_id += 1
+                elif value:
+                    self._add_text_run(paragraph, value)
+
+        return media
+
+    @staticmethod
+    def _add_text_run(paragraph, text: str):
+        """Append a w:r like python-docx ``add_run``: tabs and line breaks become w:tab / w:br."""
+        run = etree.SubElement(paragraph, _w("r"))
+        buffer = ""
+
+        def flush():
+            nonlocal buffer
+            if buffer:
+                t = etree.SubElement(run, _w("t"))
+                t.text = buffer
+                if buffer != buffer.strip():
+                    t.set(XML_SPACE, "preserve")
+                buffer = ""
+
+        for char in text:
+            if char == "\t":
+                flush()
+                etree.SubElement(run, _w("tab"))
+            elif char in "\r\n":
+                flush()
+                etree.SubElement(run, _w("br"))
+            else:
+                buffer += char
+        flush()
+
+    def _picture_run(self, image_path: str, rel_id: str, doc_pr_id: int):
+        size = _image_size(image_path)
+        cx = self.icon_width
+        cy = int(cx * size[1] / size[0]) if size and size[0] else cx
+        run = etree.fromstring(INLINE_PICTURE_XML.format(cx=cx, cy=cy, doc_pr_id=doc_pr_id, rel_id=rel_id))
+        run.find(".//pic:cNvPr", NS).set("name", os.path.basename(image_path))
+        return run
+
+    # ---------- relationships & content types ----------
+
+    @staticmethod
+    def _new_media_part(image_path: str, document_part: str, existing_parts) -> str:
+        ext = os.path.splitext(image_path)[1].lower() or ".png"
+        media_dir = posixpath.join(posixpath.dirname(document_part), "media")
+        taken = {name.lower() for name in existing_parts}
+        n = 1
+        while posixpath.join(media_dir, f"falc_icon{n}{ext}").lower() in taken:
+            n += 1
+        return posixpath.join(media_dir, f"falc_icon{n}{ext}")
+
+    @staticmethod
+    def _add_image_rel(rels, rel_ids, target: str) -> str:
+        n = len(rel_ids) + 1
+        while f"rId{n}" in rel_ids:
+            n += 1
+        rel_id = f"rId{n}"
+        rel_ids.add(rel_id)
+        etree.SubElement(
+            rels,
+            f"{{{NS['rel']}}}Relationship",
+            Id=rel_id,
+            Type=IMAGE_REL_TYPE,
+            Target=target,
+        )
+        return rel_id
+
+    @staticmethod
+    def _register_content_types(content_types, media: Dict[str, str]):
+        defaults = {el.get("Extension", "").lower() for el in content_types.findall(f"{{{NS['ct']}}}Default")}
+        for part_name in media:
+            ext = os.path.splitext(part_name)[1].lstrip(".")
+            if ext in defaults:
+                continue
+            content_type = mimetypes.types_map.get(f".{ext}", "application/octet-stream")
+            default = etree.Element(f"{{{NS['ct']}}}Default", Extension=ext, ContentType=content_type)
+            content_types.insert(0, default)
+            defaults.add(ext)
+
+    # ---------- zip helpers ----------
+
+    @staticmethod
+    def _serialize(root) -> bytes:
+        return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+    @staticmethod
+    def _clone_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+        clone = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+        clone.compress_type = info.compress_type
+        clone.external_attr = info.external_attr
+        clone.create_system = info.create_system
+        clone.file_size = info.file_size
+        return clone
@@ -0,0 +1,181 @@
+import zipfile
+from pathlib import Path
+
+import pytest
+from docx import Document
+from docx.shared import Inches
+from lxml import etree
+
+from falc_crew.tools.docx_patch import NS, DocxXmlPatcher
+
+ICONS_DIR = Path(__file__).resolve().parents[1] / "knowledge" / "icons"
+PHOTO = str(ICONS_DIR / "douche.png")
+ICON = str(ICONS_DIR / "telephone.png")
+PNG_DEFAULT = b'<Default Extension="png" ContentType="image/png"/>'
+
+
+def build_docx(path):
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "En-tête EVAM"
+    doc.add_paragraph("Expéditeur")
+    doc.add_paragraph("Ancien sujet", style="Heading 2")
+    doc.add_paragraph().add_run().add_picture(PHOTO, width=Inches(1))
+    doc.add_paragraph("Ancien corps 1")
+    doc.add_paragraph("Ancien corps 2")
+    doc.save(path)
+    return path
+
+
+def rewrite_zip(src, dst, edit):
+    """Copy a zip, letting ``edit(name, data)`` return a new (name, data) pair or None to drop the part."""
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED) as zout:
+        for name in zin.namelist():
+            edited = edit(name, zin.read(name))
+            if edited:
+                zout.writestr(*edited)
+    return dst
+
+
+def rel_ids(docx_path, rels_part="word/_rels/document.xml.rels"):
+    with zipfile.ZipFile(docx_path) as z:
+        return {rel.get("Id"): rel for rel in etree.fromstring(z.read(rels_part))}
+
+
+@pytest.fixture
+def original(tmp_path):
+    return build_docx(str(tmp_path / "original.docx"))
+
+
+def test_patch_replaces_paragraphs_and_keeps_untouched_parts(original, tmp_path):
+    output = str(tmp_path / "output.docx")
+    patcher = DocxXmlPatcher(original)
+    patcher.replace_paragraph(1, [("text", "Nouveau sujet")])
+    patcher.replace_paragraph(3, [("icon", ICON), ("text", " Appelez-nous\tvite"), ("icon", ICON)])
+    patcher.replace_paragraph(99, [("text", "hors limites")])
+    patcher.save(output)
+
+    doc = Document(output)
+    assert [(p.text, p.style.name) for p in doc.paragraphs] == [
+        ("Expéditeur", "Normal"),
+        ("Nouveau sujet", "Heading 2"),
+        ("", "Normal"),
+        (" Appelez-nous\tvite", "Normal"),
+        ("Ancien corps 2", "Normal"),
+    ]
+    assert doc.sections[0].header.paragraphs[0].text == "En-tête EVAM"
+
+    with zipfile.ZipFile(original) as zin, zipfile.ZipFile(output) as zout:
+        assert set(zout.namelist()) - set(zin.namelist()) == {"word/media/falc_icon1.png"}
+        for name in zin.namelist():
+            if name not in ("word/document.xml", "word/_rels/document.xml.rels"):
+                assert zout.read(name) == zin.read(name), name
+
+
+def test_icon_matches_python_docx_picture(original, tmp_path):
+    output = str(tmp_path / "output.docx")
+    patcher = DocxXmlPatcher(original, icon_width_inches=0.2)
+    patcher.replace_paragraph(4, [("icon", ICON)])
+    patcher.save(output)
+
+    reference = Document()
+    reference.add_paragraph().add_run().add_picture(ICON, width=Inches(0.2))
+    expected = reference.inline_shapes[0]
+
+    shapes = Document(output).inline_shapes
+    assert len(shapes) == 2
+    assert (shapes[1].width, shapes[1].height) == (expected.width, expected.height)
+
+    rels = rel_ids(output)
+    assert len(rels) == len(rel_ids(original)) + 1
+    icon_rel = next(rel for rel in rels.values() if rel.get("Target") == "media/falc_icon1.png")
+    assert icon_rel.get("Type") == "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+
+
+def test_png_content_type_is_registered(original, tmp_path):
+    stripped = rewrite_zip(
+        original,
+        str(tmp_path / "no_png.docx"),
+        lambda name, data: (name, data.replace(PNG_DEFAULT, b"") if name == "[Content_Types].xml" else data),
+    )
+    output = str(tmp_path / "output.docx")
+    patcher = DocxXmlPatcher(stripped)
+    patcher.replace_paragraph(4, [("icon", ICON)])
+    patcher.save(output)
+
+    with zipfile.ZipFile(output) as z:
+        content_types = etree.fromstring(z.read("[Content_Types].xml"))
+    defaults = {el.get("Extension"): el.get("ContentType") for el in content_types.findall("ct:Default", NS)}
+    assert defaults["png"] == "image/png"
+
+
+def test_existing_media_name_and_rel_id_are_not_reused(original, tmp_path):
+    existing = rel_ids(original)
+    taken_id = f"rId{len(existing) + 2}"
+
+    def add_foreign_icon(name, data):
+        if name == "word/_rels/document.xml.rels":
+            rel = (
+                f'<Relationship Id="{taken_id}" Target="media/falc_icon1.png" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"/>'
+            )
+            data = data.replace(b"</Relationships>", rel.encode() + b"</Relationships>")
+        return name, data
+
+    source = rewrite_zip(original, str(tmp_path / "taken.docx"), add_foreign_icon)
+    with zipfile.ZipFile(source, "a") as z:
+        z.write(PHOTO, "word/media/falc_icon1.png")
+
+    output = str(tmp_path / "output.docx")
+    patcher = DocxXmlPatcher(source)
+    patcher.replace_paragraph(4, [("icon", ICON)])
+    patcher.save(output)
+
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(output) as zout:
+        assert zout.read("word/media/falc_icon1.png") == zin.read("word/media/falc_icon1.png")
+        assert zout.read("word/media/falc_icon2.png") == Path(ICON).read_bytes()
+
+    rels = rel_ids(output)
+    assert rels[taken_id].get("Target") == "media/falc_icon1.png"
+    new_ids = set(rels) - set(rel_ids(source))
+    assert len(new_ids) == 1
+    assert rels[new_ids.pop()].get("Target") == "media/falc_icon2.png"
+    assert len(Document(output).inline_shapes) == 2
+
+
+def test_main_document_part_is_resolved_from_package_rels(original, tmp_path):
+    renames = {
+        "word/document.xml": "word/document2.xml",
+        "word/_rels/document.xml.rels": "word/_rels/document2.xml.rels",
+    }
+
+    def rename_document(name, data):
+        if name in ("_rels/.rels", "[Content_Types].xml"):
+            data = data.replace(b"/word/document.xml", b"/word/document2.xml").replace(
+                b'"word/document.xml"', b'"word/document2.xml"'
+            )
+        return renames.get(name, name), data
+
+    source = rewrite_zip(original, str(tmp_path / "document2.docx"), rename_document)
+    output = str(tmp_path / "output.docx")
+    patcher = DocxXmlPatcher(source)
+    patcher.replace_paragraph(1, [("text", "Nouveau sujet")])
+    patcher.replace_paragraph(4, [("icon", ICON)])
+    patcher.save(output)
+
+    doc = Document(output)
+    assert doc.paragraphs[1].text == "Nouveau sujet"
+    assert len(doc.inline_shapes) == 2
+    with zipfile.ZipFile(output) as z:
+        assert "word/document.xml" not in z.namelist()
+    assert any(rel.get("Target") == "media/falc_icon1.png" for rel in rel_ids(output, "word/_rels/document2.xml.rels").values())
+
+
+def test_missing_main_document_part_raises(original, tmp_path):
+    source = rewrite_zip(
+        original,
+        str(tmp_path / "broken.docx"),
+        lambda name, data: None if name == "word/document.xml" else (name, data),
+    )
+
+    with pytest.raises(ValueError, match="main document part"):
+        DocxXmlPatcher(source).save(str(tmp_path / "output.docx"))
@@ -0,0 +1,287 @@
+import gc
+import os
+import threading
+import time
+
+import pytest
+from chromadb import EmbeddingFunction
+from chromadb.api.shared_system_client import SharedSystemClient
+from crewai import Agent, Crew, Task
+
+from falc_crew import memory_policy
+from falc_crew.memory_policy import (
+    BoundedLTMStorage,
+    BoundedRAGStorage,
+    MemoryPolicy,
+    memory_metrics,
+)
+
+
+class StubEmbedding(EmbeddingFunction):
+    """Deterministic letter-count embedding, no API call."""
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        return [[float(text.lower().count(c)) + 0.01 for c in "abcdefghijklmnopqrstuvwxyz"] for text in input]
+
+
+STUB_EMBEDDER = {"provider": "custom", "config": {"embedder": StubEmbedding()}}
+
+
+class BlockingEmbedding(StubEmbedding):
+    """Blocks on "slow" texts until ``release`` is set, like a pending embedding API call."""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, input):
+        if "slow" in input:
+            self.entered.set()
+            self.release.wait(5)
+        return super().__call__(input)
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    monkeypatch.setattr(memory_policy, "_METRICS", {})
+
+
+def rag_storage(tmp_path, **kwargs):
+    return BoundedRAGStorage("short_term", str(tmp_path), embedder_config=STUB_EMBEDDER, **kwargs)
+
+
+def open_fds():
+    """Number of open file descriptors, 0 where /proc is not available."""
+    return len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else 0
+
+
+def ltm_save(storage, description, when=None):
+    storage.save(description, {"quality": 8}, str(when or time.time()), 8)
+
+
+# ========== MemoryPolicy.from_env ==========
+def test_from_env_defaults(monkeypatch):
+    for name in ("FALC_MEMORY_MODE", "FALC_MEMORY_MAX_ENTRIES", "FALC_MEMORY_TTL_SECONDS"):
+        monkeypatch.delenv(name, raising=False)
+
+    policy = MemoryPolicy.from_env()
+
+    assert policy.mode == "job"
+    assert policy.max_entries == memory_policy.DEFAULT_MAX_ENTRIES
+    assert policy.ttl_seconds is None
+
+
+def test_from_env_zero_cap_and_blank_ttl(monkeypatch):
+    monkeypatch.setenv("FALC_MEMORY_MODE", " Shared ")
+    monkeypatch.setenv("FALC_MEMORY_MAX_ENTRIES", "0")
+    monkeypatch.setenv("FALC_MEMORY_TTL_SECONDS", "")
+
+    policy = MemoryPolicy.from_env()
+
+    assert policy.mode == "shared"
+    assert policy.max_entries is None
+    assert policy.ttl_seconds is None
+
+
+def test_from_env_invalid_mode(monkeypatch):
+    monkeypatch.setenv("FALC_MEMORY_MODE", "forever")
+
+    with pytest.raises(ValueError):
+        MemoryPolicy.from_env()
+
+
+def test_off_mode_has_no_scope():
+    policy = MemoryPolicy(mode="off")
+
+    assert not policy.enabled
+    assert policy.open_scope() is None
+
+
+# ========== BoundedRAGStorage ==========
+def test_rag_storage_evicts_least_recently_used(tmp_path):
+    storage = rag_storage(tmp_path, max_entries=2)
+    storage.save("aaaa", {"n": 1})
+    storage.save("zzzz", {"n": 2})
+
+    # Touch "aaaa" so "zzzz" becomes the least recently used entry
+    hits = storage.search("aaaa", limit=1, score_threshold=0)
+    assert [hit["context"] for hit in hits] == ["aaaa"]
+
+    storage.save("mmmm", {"n": 3})
+
+    assert storage.count() == 2
+    assert sorted(storage._rag.collection.get()["documents"]) == ["aaaa", "mmmm"]
+    metrics = memory_metrics()["short_term"]
+    assert metrics["entries"] == 2
+    assert metrics["saves"] == 3
+    assert metrics["lru_evictions"] == 1
+    assert metrics["searches"] == 1
+
+
+def test_rag_storage_expires_entries(tmp_path):
+    storage = rag_storage(tmp_path, ttl_seconds=0.05)
+    storage.save("aaaa", {"n": 1})
+    time.sleep(0.1)
+
+    assert storage.search("aaaa", score_threshold=0) == []
+    assert storage.count() == 0
+    assert storage._rag.collection.count() == 0
+    metrics = memory_metrics()["short_term"]
+    assert metrics["ttl_evictions"] == 1
+    assert metrics["entries"] == 0
+
+
+def test_rag_storage_embeds_outside_the_lock(tmp_path):
+    embedding = BlockingEmbedding()
+    storage = BoundedRAGStorage(
+        "short_term", str(tmp_path), embedder_config={"provider": "custom", "config": {"embedder": embedding}}
+    )
+    slow = threading.Thread(target=storage.save, args=("slow", {"n": 1}))
+    slow.start()
+    assert embedding.entered.wait(5)
+
+    fast = threading.Thread(target=storage.save, args=("fast", {"n": 2}))
+    fast.start()
+    fast.join(2)
+    try:
+        assert not fast.is_alive()
+        assert storage.count() == 1
+    finally:
+        embedding.release.set()
+        slow.join()
+        fast.join()
+    assert storage.count() == 2
+
+
+def test_rag_storage_reset_releases_entries(tmp_path):
+    storage = rag_storage(tmp_path)
+    storage.save("aaaa", {"n": 1})
+    storage.save("bbbb", {"n": 2})
+
+    storage.reset()
+
+    assert storage.count() == 0
+    assert storage._rag.collection.count() == 0
+    assert memory_metrics()["short_term"]["entries"] == 0
+
+
+# ========== BoundedLTMStorage ==========
+def test_ltm_storage_drops_oldest_rows(tmp_path):
+    storage = BoundedLTMStorage(str(tmp_path / "ltm.db"), max_entries=2)
+    for description in ("first", "second", "third"):
+        ltm_save(storage, description)
+
+    assert storage.count() == 2
+    assert storage.load("first", 1) is None
+    assert storage.load("third", 1)[0]["score"] == 8
+    metrics = memory_metrics()["long_term"]
+    assert metrics["entries"] == 2
+    assert metrics["lru_evictions"] == 1
+    assert metrics["searches"] == 2
+
+
+def test_ltm_storage_expires_rows(tmp_path):
+    storage = BoundedLTMStorage(str(tmp_path / "ltm.db"), ttl_seconds=60)
+    ltm_save(storage, "old", when=time.time() - 120)
+    ltm_save(storage, "new")
+
+    assert storage.load("old", 1) is None
+    assert storage.count() == 1
+    assert memory_metrics()["long_term"]["ttl_evictions"] == 1
+
+
+# ========== MemoryScope ==========
+def test_job_scope_is_wiped_on_close():
+    scope = MemoryPolicy(mode="job", embedder_config=STUB_EMBEDDER).open_scope()
+    scope.short_term.save("aaaa", {"n": 1})
+    scope.entities.save("bbbb", {"n": 2})
+    ltm_save(scope.long_term, "task")
+
+    scope.close()
+    scope.close()
+
+    assert not os.path.exists(scope.path)
+    assert all(metrics["entries"] == 0 for metrics in memory_metrics().values())
+
+
+def test_job_scopes_do_not_see_each_other():
+    policy = MemoryPolicy(mode="job", embedder_config=STUB_EMBEDDER)
+    first, second = policy.open_scope(), policy.open_scope()
+    try:
+        first.short_term.save("aaaa", {"n": 1})
+        second.short_term.save("aaab", {"n": 2})
+
+        assert [hit["context"] for hit in first.short_term.search("aaaa", limit=5, score_threshold=0)] == ["aaaa"]
+        first.close()
+        assert [hit["context"] for hit in second.short_term.search("aaaa", limit=5, score_threshold=0)] == ["aaab"]
+    finally:
+        first.close()
+        second.close()
+
+
+def test_job_scopes_reuse_one_chroma_client():
+    policy = MemoryPolicy(mode="job", embedder_config=STUB_EMBEDDER)
+
+    def job():
+        scope = policy.open_scope()
+        scope.short_term.save("aaaa", {"n": 1})
+        scope.entities.save("bbbb", {"n": 2})
+        ltm_save(scope.long_term, "task")
+        scope.short_term.search("aaaa", score_threshold=0)
+        scope.close()
+
+    job()
+    # crewai's LTMSQLiteStorage leaves its sqlite connections to the cyclic GC
+    gc.collect()
+    clients = len(SharedSystemClient._identifier_to_system)
+    fds = open_fds()
+
+    for _ in range(10):
+        job()
+    gc.collect()
+
+    assert len(SharedSystemClient._identifier_to_system) == clients
+    assert open_fds() <= fds
+
+
+def test_shared_scope_outlives_close(monkeypatch):
+    monkeypatch.setattr(memory_policy, "_SHARED_SCOPE", None)
+    policy = MemoryPolicy(mode="shared", embedder_config=STUB_EMBEDDER)
+    scope = policy.open_scope()
+    scope.short_term.save("aaaa", {"n": 1})
+
+    scope.close()
+
+    assert policy.open_scope() is scope
+    assert scope.short_term.count() == 1
+    scope._release()
+    assert not os.path.exists(scope.path)
+
+
+def test_attached_crew_can_be_copied(monkeypatch, tmp_path):
+    # Crew.train() and Crew.test() both start with Crew.copy()
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    # The copy falls back to crewai's default memories, keep them out of the user data dir
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path))
+    agent = Agent(role="Writer", goal="Write", backstory="Writes letters", llm="gpt-4.1-mini")
+    task = Task(description="Write a letter", expected_output="A letter", agent=agent)
+    scope = MemoryPolicy(mode="job", embedder_config=STUB_EMBEDDER).open_scope()
+    crew = scope.attach(Crew(agents=[agent], tasks=[task], memory=False))
+
+    try:
+        assert crew.memory
+        assert crew._short_term_memory.storage is scope.short_term
+        assert crew._entity_memory.storage is scope.entities
+        assert crew._long_term_memory.storage is scope.long_term
+        crew.copy()
+
+        scope.detach(crew)
+        assert not crew.memory
+        assert crew._short_term_memory is None
+        assert crew._entity_memory is None
+        assert crew._long_term_memory is None
+    finally:
+        scope.close()